@@ -11,25 +11,37 @@ class Config:
     DEFAULT_SPEED_WITH_SUBTITLE = 1.0
     DEFAULT_SUBTITLE_BUFFER = 0.5
     
+    # Text subtitle formats pysubs2 can load directly
+    TEXT_SUBTITLE_SUFFIXES = ('.srt', '.ass', '.ssa', '.vtt')
+
     # FFmpeg settings
     VIDEO_CODEC = 'libx264'
     AUDIO_CODEC = 'aac'
     VIDEO_PRESET = 'fast'
     SUBTITLE_CODEC = 'srt'
+
+    # Hardware encoders, in order of preference
+    HW_ENCODER_PRIORITY = ('h264_nvenc', 'h264_qsv', 'h264_videotoolbox', 'h264_vaapi')
+    VAAPI_DEVICE = '/dev/dri/renderD128'
     
     # File encoding
     ENCODING_UTF8_SIG = 'utf-8-sig'
     ENCODING_UTF8 = 'utf-8'
-    
-    # SRT parsing constants
-    SRT_TIME_DELIMITER = ' --> '
-    SRT_BLOCK_DELIMITER = '\n\n'
-    MIN_SRT_LINES = 3
+
+    # SRT files at least this large are scanned through mmap instead of
+    # being read into a str copy
+    MMAP_THRESHOLD = 1 << 20
     
     # Time conversion constants
     SECONDS_PER_HOUR = 3600
     SECONDS_PER_MINUTE = 60
+    MS_PER_HOUR = 3600000
+    MS_PER_MINUTE = 60000
     
+    # Segment density (segments per second) above which the segmented
+    # pipeline degenerates and the scheduled single pass is used instead
+    DENSE_SEGMENTS_PER_SECOND = 0.5
+
     # File naming
     SEGMENT_FILENAME_FORMAT = 'segment_{:04d}.mkv'
     CONCAT_FILE_SUFFIX = '.txt'
\ No newline at end of file
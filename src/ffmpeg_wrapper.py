@@ -2,29 +2,56 @@
 FFmpeg wrapper for video processing operations
 """
 
+import functools
 import json
+import os
+import shutil
 import subprocess
+import tempfile
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple, TYPE_CHECKING
 
 from .config import Config
 from .exceptions import VideoProcessingError, FFmpegError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if TYPE_CHECKING:
+    from .models import VideoSegment
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_installed() -> bool:
+    """Check whether the ffmpeg binary is on PATH"""
+    return shutil.which('ffmpeg') is not None
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_hw_encoder() -> str:
+    """Detect the best available hardware H.264 encoder"""
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                capture_output=True, text=True, check=True)
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return Config.VIDEO_CODEC
+
+    for encoder in Config.HW_ENCODER_PRIORITY:
+        if encoder in result.stdout:
+            return encoder
+
+    return Config.VIDEO_CODEC
+
 
 class FFmpegWrapper:
     """Wrapper for FFmpeg operations"""
     
     @staticmethod
     def is_installed() -> bool:
-        """Check if FFmpeg is installed"""
-        try:
-            subprocess.run(['ffmpeg', '-version'],
-                           stdout=subprocess.DEVNULL,
-                           stderr=subprocess.DEVNULL,
-                           check=True)
-            return True
-        except (FileNotFoundError, subprocess.CalledProcessError):
-            return False
+        """Check if FFmpeg is installed, caching the PATH lookup"""
+        return _ffmpeg_installed()
     
     @staticmethod
     def get_video_info(input_file: Path) -> Dict[str, Any]:
@@ -35,13 +62,47 @@ class FFmpegWrapper:
         ]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            # Keep stdout as bytes; both parsers take them directly and
+            # orjson decodes UTF-8 in C without an intermediate str
+            result = subprocess.run(cmd, capture_output=True, check=True)
+            if orjson is not None:
+                return orjson.loads(result.stdout)
             return json.loads(result.stdout)
         except subprocess.CalledProcessError as e:
-            raise VideoProcessingError(f"Failed to read video info: {e.stderr}")
-        except json.JSONDecodeError as e:
+            # stderr is bytes here since stdout must stay undecoded
+            raise VideoProcessingError(
+                f"Failed to read video info: {e.stderr.decode(errors='replace')}")
+        except ValueError as e:
             raise VideoProcessingError(f"Failed to parse video info: {e}")
     
+    @staticmethod
+    def get_keyframe_times(input_file: Path) -> List[float]:
+        """Get sorted keyframe timestamps of the first video stream"""
+        cmd = [
+            'ffprobe', '-v', 'quiet',
+            '-select_streams', 'v:0',
+            '-skip_frame', 'nokey',
+            '-show_entries', 'frame=pts_time',
+            '-of', 'csv=p=0',
+            str(input_file)
+        ]
+
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise VideoProcessingError(f"Failed to read keyframes: {e.stderr}")
+
+        times = []
+        for line in result.stdout.split():
+            # ffprobe emits N/A for frames without timestamps, and csv
+            # rows can carry trailing separators
+            try:
+                times.append(float(line.rstrip(',')))
+            except ValueError:
+                continue
+        times.sort()
+        return times
+
     @staticmethod
     def extract_subtitle_to_srt(input_file: Path, subtitle_index: int, output_file: Path) -> None:
         """Extract subtitle stream to SRT file"""
@@ -58,40 +119,316 @@ class FFmpegWrapper:
             raise FFmpegError(f"Failed to extract subtitles: {e.stderr}")
     
     @staticmethod
-    def process_video_segment(input_file: Path, output_file: Path, start_time: float, 
-                            duration: float, speed: float, has_subtitle: bool = False) -> None:
-        """Process a single video segment with speed adjustment"""
-        cmd = [
-            'ffmpeg', '-i', str(input_file),
+    def build_segment_command(input_file: Path, output_file: Path, start_time: float,
+                              duration: float, speed: float, has_subtitle: bool = False,
+                              threads: int = 0, stream_copy: bool = False) -> List[str]:
+        """Build the FFmpeg command for a single segment
+
+        Segments marked `stream_copy` are copied with a fast input seek
+        instead of being decoded and re-encoded. Copied segments are
+        later concatenated with re-encoded ones, which only works when
+        every entry shares the same codecs, so the caller must only set
+        the flag when the source streams already match the encode
+        targets; with keyframe-aligned boundaries the copy is
+        frame-accurate, otherwise the cut may shift to the nearest
+        keyframe, which is acceptable at segment boundaries.
+        """
+        if stream_copy:
+            # Map the same video/audio pair as the encode branch and drop
+            # subtitles; concatenation needs identical stream layouts
+            return [
+                'ffmpeg', '-ss', str(start_time),
+                '-i', str(input_file),
+                '-t', str(duration),
+                '-map', '0:v:0', '-map', '0:a:0', '-sn',
+                '-c', 'copy',
+                '-avoid_negative_ts', 'make_zero',
+                str(output_file), '-y'
+            ]
+
+        input_args, codec_args, filter_suffix = FFmpegWrapper._video_encoder_args()
+
+        cmd = ['ffmpeg'] + input_args + [
+            '-i', str(input_file),
             '-ss', str(start_time),
             '-t', str(duration),
             '-filter_complex',
-            f"[0:v]setpts={1 / speed}*PTS[v];[0:a]atempo={speed}[a]",
+            f"[0:v]setpts={1 / speed}*PTS{filter_suffix}[v];"
+            f"[0:a]{FFmpegWrapper._atempo_chain(speed)}[a]",
             '-map', '[v]', '-map', '[a]',
-            '-c:v', Config.VIDEO_CODEC, '-preset', Config.VIDEO_PRESET,
+        ] + codec_args + [
             '-c:a', Config.AUDIO_CODEC,
-            str(output_file), '-y'
         ]
-        
+
+        # Output options must precede the output path; ffmpeg ignores
+        # anything trailing the last output
+        if threads:
+            cmd.extend(['-threads', str(threads)])
+
         if has_subtitle:
             cmd.extend(['-c:s', 'copy'])
-        
+
+        cmd.extend([str(output_file), '-y'])
+        return cmd
+
+    @staticmethod
+    def process_video_segment(input_file: Path, output_file: Path, start_time: float,
+                            duration: float, speed: float, has_subtitle: bool = False,
+                            threads: int = 0, stream_copy: bool = False) -> None:
+        """Process a single video segment with speed adjustment"""
+        cmd = FFmpegWrapper.build_segment_command(
+            input_file, output_file, start_time, duration, speed,
+            has_subtitle, threads, stream_copy
+        )
+
         try:
             subprocess.run(cmd, capture_output=True, check=True)
         except subprocess.CalledProcessError as e:
             raise VideoProcessingError(f"Failed to process segment {output_file}: {e.stderr}")
     
     @staticmethod
-    def concatenate_videos(segment_files: list[Path], output_file: Path, list_file: str) -> None:
-        """Concatenate video segments using FFmpeg"""
+    def detect_hw_encoder() -> str:
+        """Get the preferred video encoder, probing FFmpeg only once"""
+        return _detect_hw_encoder()
+
+    @staticmethod
+    def _video_encoder_args() -> Tuple[List[str], List[str], str]:
+        """Get (input args, codec args, filter suffix) for the video encoder
+
+        Input args always request hardware-assisted decode; without an
+        explicit output format FFmpeg downloads decoded frames back to
+        system memory, so the software filter graph keeps working even
+        when the encode stays on libx264.
+        """
+        encoder = FFmpegWrapper.detect_hw_encoder()
+        input_args = ['-hwaccel', 'auto']
+
+        if encoder == 'h264_nvenc':
+            return input_args, ['-c:v', 'h264_nvenc', '-preset', 'p4', '-rc', 'vbr', '-cq', '23'], ''
+        if encoder == 'h264_qsv':
+            return input_args, ['-c:v', 'h264_qsv', '-global_quality', '23'], ''
+        if encoder == 'h264_videotoolbox':
+            return input_args, ['-c:v', 'h264_videotoolbox'], ''
+        if encoder == 'h264_vaapi':
+            # VAAPI encodes from GPU surfaces, so frames leaving the
+            # software filters must be uploaded first
+            return (input_args + ['-vaapi_device', Config.VAAPI_DEVICE],
+                    ['-c:v', 'h264_vaapi'],
+                    ',format=nv12,hwupload')
+
+        return input_args, ['-c:v', Config.VIDEO_CODEC, '-preset', Config.VIDEO_PRESET], ''
+
+    @staticmethod
+    def _atempo_factors(speed: float) -> List[float]:
+        """Split a speed factor into per-stage atempo factors
+
+        A single atempo only accepts factors in [0.5, 2.0]; outside that
+        range it drops samples or fails outright, so larger factors are
+        spread over multiple stages.
+        """
+        factors = []
+
+        while speed > 2.0:
+            factors.append(2.0)
+            speed /= 2.0
+        while speed < 0.5:
+            factors.append(0.5)
+            speed /= 0.5
+
+        factors.append(speed)
+        return factors
+
+    @staticmethod
+    def _atempo_chain(speed: float) -> str:
+        """Build an atempo filter chain valid for any speed factor"""
+        return ','.join(f'atempo={factor}'
+                        for factor in FFmpegWrapper._atempo_factors(speed))
+
+    @staticmethod
+    def build_filter_complex(segments: List['VideoSegment'], video_filter_suffix: str = '',
+                             cumulative: bool = False) -> str:
+        """Build a single filter_complex graph covering all segments
+
+        With `cumulative=True` the trim windows are expressed against the
+        concatenated timeline produced by the concat demuxer, where each
+        segment starts right after the previous one, instead of against
+        the source timestamps.
+        """
+        n = len(segments)
+        video_labels = ''.join(f'[v{i}]' for i in range(n))
+        audio_labels = ''.join(f'[a{i}]' for i in range(n))
+
+        windows = []
+        offset = 0.0
+        for segment in segments:
+            if cumulative:
+                windows.append((offset, offset + segment.duration, segment.speed))
+                offset += segment.duration
+            else:
+                windows.append((segment.start_time, segment.end_time, segment.speed))
+
+        parts = [
+            f"[0:v]split={n}{video_labels}",
+            f"[0:a]asplit={n}{audio_labels}",
+        ]
+
+        for i, (start, end, speed) in enumerate(windows):
+            parts.append(
+                f"[v{i}]trim=start={start}:end={end},"
+                f"setpts=(PTS-STARTPTS)/{speed}[vt{i}]"
+            )
+            parts.append(
+                f"[a{i}]atrim=start={start}:end={end},"
+                f"asetpts=PTS-STARTPTS,{FFmpegWrapper._atempo_chain(speed)}[at{i}]"
+            )
+
+        pairs = ''.join(f'[vt{i}][at{i}]' for i in range(n))
+
+        if video_filter_suffix:
+            parts.append(f"{pairs}concat=n={n}:v=1:a=1[vcat][aout]")
+            parts.append(f"[vcat]{video_filter_suffix.lstrip(',')}[vout]")
+        else:
+            parts.append(f"{pairs}concat=n={n}:v=1:a=1[vout][aout]")
+
+        return ';'.join(parts)
+
+    @staticmethod
+    def process_all_segments(input_file: Path, output_file: Path,
+                             segments: List['VideoSegment']) -> None:
+        """Process all segments in a single FFmpeg pass
+
+        The segment ranges are fed through the concat demuxer as
+        inpoint/outpoint entries, so ffmpeg iterates them natively in one
+        demux context; the filter_complex graph then retimes each range
+        and concatenates the results in-graph, so no intermediate files
+        are written. A movie=/amovie= source graph would achieve the
+        same decode-once fan-out but opens the input once per media
+        type, so the demuxer input is kept.
+        """
+        input_args, codec_args, filter_suffix = FFmpegWrapper._video_encoder_args()
+        filter_complex = FFmpegWrapper.build_filter_complex(segments, filter_suffix,
+                                                            cumulative=True)
+
+        source = Path(input_file).resolve()
+        with tempfile.NamedTemporaryFile(mode='w', suffix=Config.CONCAT_FILE_SUFFIX,
+                                         delete=False) as f:
+            for segment in segments:
+                f.write(f"file '{source}'\n")
+                f.write(f"inpoint {segment.start_time}\n")
+                f.write(f"outpoint {segment.end_time}\n")
+            list_file = f.name
+
+        cmd = ['ffmpeg'] + input_args + [
+            '-f', 'concat', '-safe', '0',
+            '-i', list_file,
+            '-filter_complex', filter_complex,
+            '-map', '[vout]', '-map', '[aout]',
+        ] + codec_args + [
+            '-c:a', Config.AUDIO_CODEC,
+            str(output_file), '-y'
+        ]
+
+        try:
+            subprocess.run(cmd, capture_output=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise VideoProcessingError(f"Failed to process video: {e.stderr}")
+        finally:
+            os.unlink(list_file)
+
+    @staticmethod
+    def _build_setpts_schedule(segments: List['VideoSegment']) -> str:
+        """Build a piecewise setpts expression mapping input to output time
+
+        setpts has no runtime command support, so per-segment video
+        speeds are encoded as one nested if() expression over the input
+        time T instead of a sendcmd schedule.
+        """
+        pieces = []
+        output_start = 0.0
+        for segment in segments:
+            pieces.append((segment.start_time, segment.end_time,
+                           segment.speed, output_start))
+            output_start += segment.output_duration
+
+        start, _, speed, offset = pieces[-1]
+        expr = f"{offset}+(T-{start})/{speed}"
+
+        for start, end, speed, offset in reversed(pieces[:-1]):
+            expr = f"if(lt(T\\,{end})\\,{offset}+(T-{start})/{speed}\\,{expr})"
+
+        return expr
+
+    @staticmethod
+    def process_with_tempo_schedule(input_file: Path, output_file: Path,
+                                    segments: List['VideoSegment']) -> None:
+        """Process the whole video in one pass with a time-varying tempo
+
+        Instead of cutting and concatenating, the video runs through a
+        single piecewise setpts expression while the audio tempo is
+        retoggled at segment boundaries via an asendcmd schedule driving
+        a fixed chain of named atempo stages. One encoder context covers
+        the whole file, so there is no per-segment setup or teardown at
+        all.
+        """
+        input_args, codec_args, filter_suffix = FFmpegWrapper._video_encoder_args()
+
+        stages = max(len(FFmpegWrapper._atempo_factors(segment.speed))
+                     for segment in segments)
+
+        schedule_lines = []
+        for segment in segments:
+            factors = FFmpegWrapper._atempo_factors(segment.speed)
+            factors += [1.0] * (stages - len(factors))
+            for stage, factor in enumerate(factors):
+                schedule_lines.append(
+                    f"{segment.start_time} atempo@t{stage} tempo {factor};")
+
+        with tempfile.NamedTemporaryFile(mode='w', suffix=Config.CONCAT_FILE_SUFFIX,
+                                         delete=False) as f:
+            f.write('\n'.join(schedule_lines) + '\n')
+            schedule_file = f.name
+
+        setpts_expr = FFmpegWrapper._build_setpts_schedule(segments)
+        audio_chain = ','.join(f'atempo@t{stage}=1.0' for stage in range(stages))
+        filter_complex = (
+            f"[0:v]setpts=({setpts_expr})/TB{filter_suffix}[v];"
+            f"[0:a]asendcmd=f={schedule_file},{audio_chain}[a]"
+        )
+
+        cmd = ['ffmpeg'] + input_args + [
+            '-i', str(input_file),
+            '-filter_complex', filter_complex,
+            '-map', '[v]', '-map', '[a]',
+        ] + codec_args + [
+            '-c:a', Config.AUDIO_CODEC,
+            str(output_file), '-y'
+        ]
+
+        try:
+            subprocess.run(cmd, capture_output=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise VideoProcessingError(f"Failed to process video: {e.stderr}")
+        finally:
+            os.unlink(schedule_file)
+
+    @staticmethod
+    def concatenate_videos(segment_files: list[Path], output_file: Path) -> None:
+        """Concatenate video segments using FFmpeg
+
+        The concat list is fed through stdin, so no temp list file is
+        created or left behind on error.
+        """
         cmd = [
             'ffmpeg', '-f', 'concat', '-safe', '0',
-            '-i', list_file,
+            '-protocol_whitelist', 'file,pipe',
+            '-i', 'pipe:0',
             '-c', 'copy',
             str(output_file), '-y'
         ]
-        
+
+        concat_list = ''.join(f"file '{segment}'\n" for segment in segment_files)
+
         try:
-            subprocess.run(cmd, capture_output=True, check=True)
+            subprocess.run(cmd, input=concat_list.encode(), capture_output=True, check=True)
         except subprocess.CalledProcessError as e:
             raise VideoProcessingError(f"Failed to concatenate segments: {e.stderr}")
\ No newline at end of file
@@ -2,20 +2,87 @@
 Data models for Smart Video Speed Controller
 """
 
+import array
+import bisect
 from dataclasses import dataclass
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 @dataclass
 class SubtitleSegment:
-    """Subtitle segment representation"""
-    start_time: float
-    end_time: float
+    """Subtitle segment representation, timed in integer milliseconds"""
+    # Explicit rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = ('start_ms', 'end_ms', 'text')
+
+    start_ms: int
+    end_ms: int
     text: str
-    
+
+    @property
+    def start_time(self) -> float:
+        """Get start time in seconds"""
+        return self.start_ms / 1000
+
+    @property
+    def end_time(self) -> float:
+        """Get end time in seconds"""
+        return self.end_ms / 1000
+
     @property
     def duration(self) -> float:
         """Get segment duration in seconds"""
-        return self.end_time - self.start_time
+        return (self.end_ms - self.start_ms) / 1000
+
+
+class ParsedSubs:
+    """Parsed subtitle track with a parallel start-time index
+
+    Behaves like the plain segment list it wraps (len, iteration,
+    indexing), while keeping a sorted array of start times so lookups
+    by playback time run as a C binary search instead of a linear scan.
+    float64 is used for the index to keep millisecond precision on
+    multi-hour tracks.
+    """
+
+    __slots__ = ('segments', '_starts')
+
+    def __init__(self, segments: List[SubtitleSegment]):
+        self.segments = segments
+        if np is not None:
+            self._starts = np.fromiter((s.start_time for s in segments),
+                                       dtype=np.float64, count=len(segments))
+        else:
+            self._starts = array.array('d', (s.start_time for s in segments))
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def __getitem__(self, index):
+        return self.segments[index]
+
+    def at(self, time_seconds: float) -> Optional[SubtitleSegment]:
+        """Get the segment on screen at the given time, or None"""
+        if np is not None:
+            index = int(np.searchsorted(self._starts, time_seconds,
+                                        side='right')) - 1
+        else:
+            index = bisect.bisect_right(self._starts, time_seconds) - 1
+
+        if index >= 0 and self.segments[index].end_time >= time_seconds:
+            return self.segments[index]
+        return None
+
+    def __reduce__(self):
+        # Pickle only the segments; the index is rebuilt on load
+        return (ParsedSubs, (self.segments,))
 
 
 @dataclass
@@ -25,6 +92,7 @@ class VideoSegment:
     end_time: float
     speed: float
     has_subtitle: bool
+    stream_copy: bool = False
     
     @property
     def duration(self) -> float:
@@ -2,14 +2,26 @@
 Main video processing logic
 """
 
+import bisect
 import os
+import subprocess
 import sys
 import tempfile
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from tqdm import tqdm
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pysubs2
+except ImportError:
+    pysubs2 = None
+
 from .config import Config
 from .exceptions import VideoProcessingError, SubtitleExtractionError, ValidationError
 from .ffmpeg_wrapper import FFmpegWrapper
@@ -39,7 +51,8 @@ class VideoSpeedProcessor:
         self.speed_no_subtitle = speed_no_subtitle
         self.speed_with_subtitle = speed_with_subtitle
         self.subtitle_buffer = subtitle_buffer
-        
+        self._video_info: Optional[dict] = None
+
         self._validate_inputs()
 
     def _validate_inputs(self) -> None:
@@ -56,12 +69,25 @@ class VideoSpeedProcessor:
         if self.subtitle_buffer < 0:
             raise ValidationError("Subtitle buffer cannot be negative")
 
+    def _get_video_info(self) -> dict:
+        """Get video info, running ffprobe only once per instance"""
+        if self._video_info is None:
+            self._video_info = FFmpegWrapper.get_video_info(self.input_file)
+        return self._video_info
+
     def _extract_subtitles(self) -> List[SubtitleSegment]:
         """Extract subtitles from video file"""
         print("Extracting subtitles from video...")
-        
+
+        if (pysubs2 is not None and
+                self.input_file.suffix.lower() in Config.TEXT_SUBTITLE_SUFFIXES):
+            subtitles = self._extract_subtitles_in_process()
+            if subtitles is not None:
+                print(f"Successfully extracted {len(subtitles)} subtitles")
+                return subtitles
+
         try:
-            video_info = FFmpegWrapper.get_video_info(self.input_file)
+            video_info = self._get_video_info()
             subtitle_streams = self._find_subtitle_streams(video_info['streams'])
             
             if not subtitle_streams:
@@ -83,7 +109,28 @@ class VideoSpeedProcessor:
                 
         except Exception as e:
             raise SubtitleExtractionError(f"Failed to extract subtitles: {e}")
-    
+
+    def _extract_subtitles_in_process(self) -> Optional[List[SubtitleSegment]]:
+        """Read subtitle timings with pysubs2, without spawning FFmpeg
+
+        pysubs2 only reads text subtitle formats, so this path applies
+        when the input itself is a subtitle file; container inputs like
+        MKV always go through FFmpeg demuxing. Returns None when pysubs2
+        cannot read the file.
+        """
+        try:
+            subs = pysubs2.load(str(self.input_file))
+        except Exception:
+            return None
+
+        subtitles = [
+            SubtitleSegment(event.start, event.end,
+                            event.plaintext.replace('\n', ' ').strip())
+            for event in subs.events
+        ]
+        subtitles.sort(key=lambda s: s.start_ms)
+        return subtitles
+
     def _find_subtitle_streams(self, streams: List[dict]) -> List[dict]:
         """Find subtitle streams in video"""
         return [s for s in streams if s.get('codec_type') == 'subtitle']
@@ -91,7 +138,7 @@ class VideoSpeedProcessor:
     def _get_video_duration(self) -> float:
         """Get video duration in seconds"""
         try:
-            video_info = FFmpegWrapper.get_video_info(self.input_file)
+            video_info = self._get_video_info()
             return float(video_info['format']['duration'])
         except Exception as e:
             raise VideoProcessingError(f"Failed to get video duration: {e}")
@@ -99,17 +146,17 @@ class VideoSpeedProcessor:
     def _create_video_segments(self, subtitles: List[SubtitleSegment],
                                video_duration: float) -> List[VideoSegment]:
         """Create video segments with appropriate speeds"""
+        windows = self._merge_windows(
+            self._compute_subtitle_windows(subtitles, video_duration))
+
         segments = []
         current_time = 0.0
 
-        for subtitle in subtitles:
-            sub_start = self._calculate_subtitle_start(subtitle.start_time)
-            sub_end = self._calculate_subtitle_end(subtitle.end_time, video_duration)
-            
+        for sub_start, sub_end in windows:
             # Add segment before subtitle if there's a gap
             if current_time < sub_start:
                 segments.append(self._create_non_subtitle_segment(current_time, sub_start))
-            
+
             # Add subtitle segment
             segments.append(self._create_subtitle_segment(sub_start, sub_end))
             current_time = sub_end
@@ -118,7 +165,47 @@ class VideoSpeedProcessor:
             segments.append(self._create_non_subtitle_segment(current_time, video_duration))
 
         return segments
-    
+
+    def _compute_subtitle_windows(self, subtitles: List[SubtitleSegment],
+                                  video_duration: float) -> List[tuple]:
+        """Compute buffered (start, end) windows for all subtitles"""
+        if np is not None and subtitles:
+            starts = np.fromiter((s.start_time for s in subtitles),
+                                 dtype=np.float64, count=len(subtitles))
+            ends = np.fromiter((s.end_time for s in subtitles),
+                               dtype=np.float64, count=len(subtitles))
+            sub_starts = np.maximum(0.0, starts - self.subtitle_buffer)
+            sub_ends = np.minimum(video_duration, ends + self.subtitle_buffer)
+            return [(float(s), float(e)) for s, e in zip(sub_starts, sub_ends)]
+
+        return [(self._calculate_subtitle_start(s.start_time),
+                 self._calculate_subtitle_end(s.end_time, video_duration))
+                for s in subtitles]
+
+    @staticmethod
+    def _merge_windows(windows: List[tuple]) -> List[tuple]:
+        """Merge subtitle windows that overlap or touch
+
+        The buffer routinely makes back-to-back subtitles overlap; each
+        extra window becomes a segment of its own, so coalescing them
+        keeps the segment count (and ffmpeg graph size) down.
+        """
+        if not windows:
+            return windows
+
+        merged = []
+        current_start, current_end = windows[0]
+
+        for start, end in windows[1:]:
+            if start <= current_end:
+                current_end = max(current_end, end)
+            else:
+                merged.append((current_start, current_end))
+                current_start, current_end = start, end
+
+        merged.append((current_start, current_end))
+        return merged
+
     def _calculate_subtitle_start(self, subtitle_start: float) -> float:
         """Calculate subtitle segment start time with buffer"""
         return max(0, subtitle_start - self.subtitle_buffer)
@@ -137,48 +224,163 @@ class VideoSpeedProcessor:
 
     def _process_video(self, segments: List[VideoSegment]) -> None:
         """Process video with defined segments"""
-        print("\\nProcessing video...")
+        print("\nProcessing video...")
+
+        total_duration = sum(segment.duration for segment in segments)
+        if (total_duration > 0 and
+                len(segments) / total_duration > Config.DENSE_SEGMENTS_PER_SECOND):
+            # Hundreds of micro-segments make the trim/concat graph
+            # pathological; switch to the scheduled single pass
+            print("Dense subtitle timeline detected, using scheduled single-pass mode")
+            FFmpegWrapper.process_with_tempo_schedule(self.input_file,
+                                                      self.output_file, segments)
+            return
+
+        try:
+            FFmpegWrapper.process_all_segments(self.input_file, self.output_file, segments)
+            return
+        except VideoProcessingError as e:
+            print(f"Single-pass processing failed, falling back to per-segment mode: {e}")
 
         with tempfile.TemporaryDirectory() as temp_dir:
             temp_path = Path(temp_dir)
             segment_files = self._process_segments(segments, temp_path)
-            
-            print("\\nConcatenating segments...")
+
+            print("\nConcatenating segments...")
             self._concat_segments(segment_files)
-    
+
+    def _can_stream_copy(self) -> bool:
+        """Check whether the source codecs allow stream-copied segments
+
+        Copied segments are concatenated with re-encoded ones, and the
+        concat demuxer requires identical codecs across entries, so
+        copying is only safe when the source already carries H.264 video
+        and the target audio codec.
+        """
+        try:
+            streams = self._get_video_info()['streams']
+        except VideoProcessingError:
+            return False
+
+        video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+        audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+        return (video is not None and video.get('codec_name') == 'h264'
+                and (audio is None or audio.get('codec_name') == Config.AUDIO_CODEC))
+
+    def _snap_to_keyframes(self, segments: List[VideoSegment]) -> List[VideoSegment]:
+        """Align speed-1.0 segment boundaries to keyframes for stream copy
+
+        Snapped segments grow to the surrounding keyframes and are marked
+        for bit-exact copying; their neighbours shrink accordingly so the
+        timeline stays contiguous. Snapped windows are clamped against
+        the previous snapped end so a sparse keyframe interval spanning
+        two segments is never emitted twice. Segments squeezed to
+        nothing are dropped.
+        """
+        if not any(segment.speed == 1.0 for segment in segments):
+            return segments
+
+        try:
+            keyframes = FFmpegWrapper.get_keyframe_times(self.input_file)
+        except VideoProcessingError:
+            return segments
+
+        if not keyframes:
+            return segments
+
+        previous_snapped_end = 0.0
+        for i, segment in enumerate(segments):
+            # Content up to the last snapped end is already covered by
+            # an earlier copy window; a sparse keyframe interval can
+            # reach well past the immediate neighbour
+            if segment.start_time < previous_snapped_end:
+                segment.start_time = min(previous_snapped_end, segment.end_time)
+
+            if segment.speed != 1.0:
+                continue
+
+            start_idx = bisect.bisect_right(keyframes, segment.start_time) - 1
+            end_idx = bisect.bisect_left(keyframes, segment.end_time)
+
+            snapped_start = keyframes[start_idx] if start_idx >= 0 else segment.start_time
+            snapped_end = keyframes[end_idx] if end_idx < len(keyframes) else segment.end_time
+
+            snapped_start = max(snapped_start, previous_snapped_end)
+            if snapped_end <= snapped_start:
+                continue
+
+            segment.start_time = snapped_start
+            segment.end_time = snapped_end
+            segment.stream_copy = True
+            previous_snapped_end = snapped_end
+
+            if i > 0:
+                segments[i - 1].end_time = min(segments[i - 1].end_time, snapped_start)
+
+        return [segment for segment in segments if segment.duration > 1e-6]
+
     def _process_segments(self, segments: List[VideoSegment], temp_path: Path) -> List[Path]:
-        """Process individual video segments"""
-        segment_files = []
-        
-        for i, segment in enumerate(tqdm(segments, desc="Processing segments")):
-            output_segment = temp_path / Config.SEGMENT_FILENAME_FORMAT.format(i)
-            self._process_single_segment(segment, output_segment)
-            segment_files.append(output_segment)
-        
+        """Process individual video segments in parallel
+
+        FFmpeg processes are launched directly with Popen and capped at a
+        fixed concurrency window, so there is no worker-process round
+        trip and the next command is prepared while earlier encodes run.
+        """
+        if self._can_stream_copy():
+            segments = self._snap_to_keyframes(segments)
+            for segment in segments:
+                if segment.speed == 1.0:
+                    segment.stream_copy = True
+
+        cpu_count = os.cpu_count() or 2
+        workers = max(1, min(len(segments), cpu_count // 2))
+        # Split encoder threads across workers to avoid oversubscription
+        encoder_threads = max(1, cpu_count // workers)
+
+        segment_files = [temp_path / Config.SEGMENT_FILENAME_FORMAT.format(i)
+                         for i in range(len(segments))]
+
+        running = []
+        try:
+            with tqdm(total=len(segments), desc="Processing segments") as progress:
+                for i, segment in enumerate(segments):
+                    while len(running) >= workers:
+                        self._finish_segment_process(*running.pop(0))
+                        progress.update(1)
+
+                    cmd = FFmpegWrapper.build_segment_command(
+                        self.input_file, segment_files[i], segment.start_time,
+                        segment.duration, segment.speed, segment.has_subtitle,
+                        encoder_threads, segment.stream_copy
+                    )
+                    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL,
+                                               stderr=subprocess.PIPE)
+                    running.append((process, segment_files[i]))
+
+                while running:
+                    self._finish_segment_process(*running.pop(0))
+                    progress.update(1)
+        finally:
+            # On failure, stop and reap the in-flight encodes before the
+            # temp directory they write into is deleted
+            for process, _ in running:
+                process.terminate()
+            for process, _ in running:
+                process.wait()
+
         return segment_files
-    
-    def _process_single_segment(self, segment: VideoSegment, output_file: Path) -> None:
-        """Process a single video segment"""
-        FFmpegWrapper.process_video_segment(
-            self.input_file, output_file, segment.start_time, 
-            segment.duration, segment.speed, segment.has_subtitle
-        )
-    
+
+    @staticmethod
+    def _finish_segment_process(process: subprocess.Popen, output_file: Path) -> None:
+        """Wait for a segment encode and raise if it failed"""
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise VideoProcessingError(f"Failed to process segment {output_file}: {stderr}")
+
     def _concat_segments(self, segment_files: List[Path]) -> None:
         """Concatenate all segments into single file"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix=Config.CONCAT_FILE_SUFFIX, delete=False) as f:
-            self._write_concat_file(f, segment_files)
-            list_file = f.name
-        
-        try:
-            FFmpegWrapper.concatenate_videos(segment_files, self.output_file, list_file)
-        finally:
-            os.unlink(list_file)
-    
-    def _write_concat_file(self, file_handle, segment_files: List[Path]) -> None:
-        """Write file list for FFmpeg concat"""
-        for segment in segment_files:
-            file_handle.write(f"file '{segment}'\\n")
+        FFmpegWrapper.concatenate_videos(segment_files, self.output_file)
 
     def process(self) -> None:
         """Main processing function"""
@@ -2,83 +2,387 @@
 Subtitle parser for SRT files
 """
 
+import functools
+import hashlib
+import mmap
+import operator
+import pickle
+import re
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from .config import Config
-from .models import SubtitleSegment
+from .models import ParsedSubs, SubtitleSegment
 from .exceptions import SubtitleExtractionError
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from srt_fast import parse as _native_parse
+except ImportError:
+    _native_parse = None
+
+# Matches a whole SRT entry: index, timing line and text, with the
+# timestamp components captured as digit groups
+_SRT_PATTERN = (
+    r'\d+\s*\n'
+    r'(\d{2}):(\d{2}):(\d{2})[,.](\d{1,3})\s*-->\s*'
+    r'(\d{2}):(\d{2}):(\d{2})[,.](\d{1,3})[^\n]*\n'
+    r'(.*?)(?=\n\s*\n|\Z)'
+)
+_SRT_RE = re.compile(_SRT_PATTERN, re.DOTALL)
+# Bytes twin of the pattern, used to scan mmap'd files without decoding
+_SRT_RE_BYTES = re.compile(_SRT_PATTERN.encode('ascii'), re.DOTALL)
+
+@functools.lru_cache(maxsize=8192)
+def _parse_timestamp(time_str: str) -> int:
+    """Convert a standalone SRT timestamp to milliseconds, memoized
+
+    Timestamp strings repeat across files (one entry's end is often the
+    next one's start), so hits skip the split and the integer math.
+    """
+    try:
+        hours, sep, rest = time_str.partition(':')
+        minutes, sep2, rest = rest.partition(':')
+        if not sep or not sep2 or ':' in rest:
+            raise ValueError
+
+        seconds, _, milliseconds = rest.partition(',')
+        if not milliseconds:
+            seconds, _, milliseconds = seconds.partition('.')
+
+        return (int(hours) * Config.MS_PER_HOUR +
+                int(minutes) * Config.MS_PER_MINUTE +
+                int(seconds) * 1000 +
+                (int(milliseconds.ljust(3, '0')[:3]) if milliseconds else 0))
+    except ValueError:
+        raise ValueError(f"Invalid time format: {time_str}")
+
+
+_CACHE_DIR = Path.home() / '.cache' / 'svsc'
+# Bump whenever the pickled segment layout changes
+_CACHE_VERSION = 4
+
+
+def _cache_connection() -> sqlite3.Connection:
+    """Open the on-disk subtitle cache, creating it if needed"""
+    _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(_CACHE_DIR / 'subs.sqlite')
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS subtitles_by_digest '
+        '(digest TEXT, version INTEGER, data BLOB, '
+        'PRIMARY KEY (digest, version))'
+    )
+    # Path-keyed rows from earlier schema versions are dead weight
+    connection.execute('DROP TABLE IF EXISTS subtitles')
+    return connection
+
+
+def _content_digest(srt_file: Path) -> Optional[str]:
+    """Hash the file content for use as a cache key"""
+    try:
+        return hashlib.blake2b(srt_file.read_bytes(), digest_size=16).hexdigest()
+    except OSError:
+        return None
+
+
+def _disk_cache_get(digest: str) -> Optional[ParsedSubs]:
+    """Look up parsed segments in the on-disk cache"""
+    try:
+        with closing(_cache_connection()) as connection:
+            row = connection.execute(
+                'SELECT data FROM subtitles_by_digest '
+                'WHERE digest=? AND version=?',
+                (digest, _CACHE_VERSION)
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+    except Exception:
+        # A broken cache must never break parsing
+        return None
+
+
+def _disk_cache_put(digest: str, segments: ParsedSubs) -> None:
+    """Store parsed segments in the on-disk cache"""
+    try:
+        with closing(_cache_connection()) as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO subtitles_by_digest VALUES (?, ?, ?)',
+                (digest, _CACHE_VERSION,
+                 pickle.dumps(segments, pickle.HIGHEST_PROTOCOL))
+            )
+            connection.commit()
+    except Exception:
+        pass
+
+
+@functools.lru_cache(maxsize=64)
+def _load_srt(path: str, mtime_ns: int, size: int) -> ParsedSubs:
+    """Load parsed segments, trying the disk cache before parsing
+
+    The disk cache is keyed by content digest rather than path, so
+    identical subtitles re-extracted into one-shot temp files still hit
+    it, and unique temp paths never accumulate rows. mtime and size
+    only key the in-process cache.
+    """
+    digest = _content_digest(Path(path))
+    parsed = _disk_cache_get(digest) if digest else None
+    if parsed is None:
+        parsed = ParsedSubs(SubtitleParser._parse_file(Path(path)))
+        if digest:
+            _disk_cache_put(digest, parsed)
+    return parsed
+
 
 class SubtitleParser:
     """Parser for subtitle files"""
     
     @staticmethod
-    def parse_srt_file(srt_file: Path) -> List[SubtitleSegment]:
-        """Parse SRT file into SubtitleSegment list"""
+    def parse_srt_file(srt_file: Path) -> ParsedSubs:
+        """Parse SRT file into an indexed ParsedSubs track
+
+        The result iterates and indexes like a segment list and adds
+        at() for O(log n) lookup by playback time. Results are cached
+        in-process keyed on the resolved path, mtime and size, and on
+        disk keyed on content, so reopening the same file — or the same
+        content under a different path — skips parsing entirely.
+        """
         try:
+            stat = srt_file.stat()
+        except OSError:
+            return ParsedSubs(SubtitleParser._parse_file(srt_file))
+
+        return _load_srt(str(srt_file.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def parse_many(srt_files: List[Path]) -> Dict[Path, ParsedSubs]:
+        """Parse several SRT files concurrently
+
+        The file reads and the regex scan both release the GIL, so a
+        thread pool overlaps disk I/O with parsing when ingesting
+        multi-track or multi-language content.
+        """
+        if not srt_files:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(8, len(srt_files))) as executor:
+            results = executor.map(SubtitleParser.parse_srt_file, srt_files)
+
+        return dict(zip(srt_files, results))
+
+    @staticmethod
+    def _parse_file(srt_file: Path) -> List[SubtitleSegment]:
+        """Parse SRT file without consulting the caches
+
+        The pattern is scanned over the decoded content as-is; its \\s*
+        tolerances absorb stray whitespace, so no whole-file or
+        per-entry strip copies are made.
+        """
+        if _native_parse is not None:
+            return SubtitleParser._parse_file_native(srt_file)
+
+        try:
+            if srt_file.stat().st_size >= Config.MMAP_THRESHOLD:
+                return SubtitleParser._parse_file_mmap(srt_file)
+
             content = SubtitleParser._read_srt_file(srt_file)
-            blocks = content.strip().split(Config.SRT_BLOCK_DELIMITER)
+
+            if np is not None:
+                return SubtitleParser._parse_matches_vectorized(
+                    _SRT_RE.findall(content))
+
             subtitles = []
-            
-            for block in blocks:
-                subtitle = SubtitleParser._parse_srt_block(block.strip())
-                if subtitle:
-                    subtitles.append(subtitle)
-            
-            return sorted(subtitles, key=lambda x: x.start_time)
-            
-        except Exception as e:
+            # Bind the bound method once; saves an attribute lookup per entry
+            append = subtitles.append
+            previous_start = -1
+            already_sorted = True
+
+            for match in _SRT_RE.finditer(content):
+                start_ms = (int(match.group(1)) * Config.MS_PER_HOUR +
+                            int(match.group(2)) * Config.MS_PER_MINUTE +
+                            int(match.group(3)) * 1000 +
+                            int(match.group(4).ljust(3, '0')))
+                end_ms = (int(match.group(5)) * Config.MS_PER_HOUR +
+                          int(match.group(6)) * Config.MS_PER_MINUTE +
+                          int(match.group(7)) * 1000 +
+                          int(match.group(8).ljust(3, '0')))
+                text = match.group(9).replace('\n', ' ').strip()
+                # Short texts (speaker tags, music notes) repeat a lot;
+                # interning collapses the duplicates to one object
+                if len(text) < 32:
+                    text = sys.intern(text)
+
+                append(SubtitleSegment(start_ms, end_ms, text))
+
+                if start_ms < previous_start:
+                    already_sorted = False
+                previous_start = start_ms
+
+            # Well-formed SRTs are already in order; only sort when not
+            if already_sorted:
+                return subtitles
+            return sorted(subtitles, key=operator.attrgetter('start_ms'))
+
+        # Targeted rather than a blanket Exception: IO, decoding and
+        # conversion failures map to extraction errors, real bugs surface
+        except (OSError, UnicodeDecodeError, ValueError) as e:
             raise SubtitleExtractionError(f"Failed to parse SRT file {srt_file}: {e}")
-    
+
     @staticmethod
-    def _read_srt_file(srt_file: Path) -> str:
-        """Read SRT file with proper encoding handling"""
-        try:
-            with open(srt_file, 'r', encoding=Config.ENCODING_UTF8_SIG) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            with open(srt_file, 'r', encoding=Config.ENCODING_UTF8) as f:
-                return f.read()
-    
+    def _parse_file_mmap(srt_file: Path) -> List[SubtitleSegment]:
+        """Parse a large SRT file through mmap
+
+        The bytes pattern runs directly over the mapped pages, so the
+        file is never copied into a Python str; only each entry's text
+        span is decoded.
+        """
+        subtitles = []
+        append = subtitles.append
+        previous_start = -1
+        already_sorted = True
+
+        with open(srt_file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for match in _SRT_RE_BYTES.finditer(mapped):
+                start_ms = (int(match.group(1)) * Config.MS_PER_HOUR +
+                            int(match.group(2)) * Config.MS_PER_MINUTE +
+                            int(match.group(3)) * 1000 +
+                            int(match.group(4).ljust(3, b'0')))
+                end_ms = (int(match.group(5)) * Config.MS_PER_HOUR +
+                          int(match.group(6)) * Config.MS_PER_MINUTE +
+                          int(match.group(7)) * 1000 +
+                          int(match.group(8).ljust(3, b'0')))
+                text = match.group(9).decode(Config.ENCODING_UTF8, errors='replace')
+                # The bytes are read raw, so CRLF endings survive here
+                if '\r' in text:
+                    text = text.replace('\r\n', '\n').replace('\r', '\n')
+                text = text.replace('\n', ' ').strip()
+                if len(text) < 32:
+                    text = sys.intern(text)
+
+                append(SubtitleSegment(start_ms, end_ms, text))
+
+                if start_ms < previous_start:
+                    already_sorted = False
+                previous_start = start_ms
+
+        if already_sorted:
+            return subtitles
+        return sorted(subtitles, key=operator.attrgetter('start_ms'))
+
     @staticmethod
-    def _parse_srt_block(block: str) -> Optional[SubtitleSegment]:
-        """Parse a single SRT block"""
-        lines = block.split('\n')
-        if len(lines) < Config.MIN_SRT_LINES:
-            return None
-        
-        timing_line = lines[1]
-        if Config.SRT_TIME_DELIMITER not in timing_line:
-            return None
-        
+    def _parse_file_native(srt_file: Path) -> List[SubtitleSegment]:
+        """Parse with the optional native srt_fast backend
+
+        srt_fast tokenizes the raw bytes in compiled code and returns
+        (start_ms, end_ms, text) tuples, which are only wrapped here.
+        """
         try:
-            start_str, end_str = timing_line.split(Config.SRT_TIME_DELIMITER)
-            start_time = SubtitleParser._parse_srt_time(start_str.strip())
-            end_time = SubtitleParser._parse_srt_time(end_str.strip())
-            text = ' '.join(lines[2:])
-            
-            return SubtitleSegment(start_time, end_time, text)
-            
-        except (ValueError, IndexError) as e:
-            raise SubtitleExtractionError(f"Invalid SRT block format: {e}")
+            entries = _native_parse(srt_file.read_bytes())
+            subtitles = [SubtitleSegment(start_ms, end_ms,
+                                         sys.intern(text) if len(text) < 32 else text)
+                         for start_ms, end_ms, text in entries]
+        except Exception as e:
+            raise SubtitleExtractionError(f"Failed to parse SRT file {srt_file}: {e}")
+
+        if all(a.start_ms <= b.start_ms for a, b in zip(subtitles, subtitles[1:])):
+            return subtitles
+        return sorted(subtitles, key=operator.attrgetter('start_ms'))
+
+    @staticmethod
+    def _parse_matches_vectorized(matches: List[tuple]) -> List[SubtitleSegment]:
+        """Turn regex matches into segments with NumPy timestamp math
+
+        All eight digit groups are converted in bulk array operations
+        instead of per-subtitle int() calls; only the millisecond
+        columns need right-padding before conversion.
+        """
+        if not matches:
+            return []
+
+        starts, ends = SubtitleParser._vectorized_times(matches)
+
+        texts = (match[8].replace('\n', ' ').strip() for match in matches)
+        subtitles = [
+            SubtitleSegment(int(start), int(end),
+                            sys.intern(text) if len(text) < 32 else text)
+            for start, end, text in zip(starts, ends, texts)
+        ]
+
+        if bool(np.all(starts[1:] >= starts[:-1])):
+            return subtitles
+        return sorted(subtitles, key=operator.attrgetter('start_ms'))
+
+    @staticmethod
+    def _vectorized_times(matches: List[tuple]):
+        """Compute (start_ms, end_ms) arrays from regex matches in bulk"""
+        digits = np.array([match[:8] for match in matches], dtype='U3')
+        values = digits[:, [0, 1, 2, 4, 5, 6]].astype(np.int64)
+        milliseconds = np.char.ljust(digits[:, [3, 7]], 3, '0').astype(np.int64)
+
+        starts = (values[:, 0] * Config.MS_PER_HOUR +
+                  values[:, 1] * Config.MS_PER_MINUTE +
+                  values[:, 2] * 1000 + milliseconds[:, 0])
+        ends = (values[:, 3] * Config.MS_PER_HOUR +
+                values[:, 4] * Config.MS_PER_MINUTE +
+                values[:, 5] * 1000 + milliseconds[:, 1])
+        return starts, ends
+
+    @staticmethod
+    def parse_srt_file_np(srt_file: Path):
+        """Parse SRT file into a NumPy structured array
+
+        A lighter alternative to SubtitleSegment objects for very long
+        tracks: fields are ('start', 'end', 'text'), the array is sorted
+        by start time in C, and callers can binary-search by time with
+        np.searchsorted. Requires NumPy.
+        """
+        if np is None:
+            raise ImportError("NumPy is required for parse_srt_file_np")
+
+        content = SubtitleParser._read_srt_file(srt_file)
+        matches = _SRT_RE.findall(content)
+
+        subtitles = np.empty(len(matches),
+                             dtype=[('start', 'f4'), ('end', 'f4'), ('text', 'O')])
+        if matches:
+            starts, ends = SubtitleParser._vectorized_times(matches)
+            subtitles['start'] = starts / 1000.0
+            subtitles['end'] = ends / 1000.0
+            subtitles['text'] = [match[8].replace('\n', ' ').strip()
+                                 for match in matches]
+            subtitles.sort(order='start')
+
+        return subtitles
+
+    @staticmethod
+    def _read_srt_file(srt_file: Path) -> str:
+        """Read SRT file with proper encoding handling
+
+        The codec is picked by sniffing for a UTF-8 BOM up front, so
+        BOM-less files are decoded exactly once instead of paying for a
+        failed utf-8-sig attempt first. CRLF line endings are normalized
+        after decoding, matching what text-mode universal newlines did.
+        """
+        data = srt_file.read_bytes()
+
+        if data[:3] == b'\xef\xbb\xbf':
+            encoding = Config.ENCODING_UTF8_SIG
+        else:
+            encoding = Config.ENCODING_UTF8
+
+        content = data.decode(encoding, errors='replace')
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return content
     
     @staticmethod
-    def _parse_srt_time(time_str: str) -> float:
-        """Convert SRT time format to seconds"""
-        time_str = time_str.replace(',', '.')
-        parts = time_str.split(':')
-        
-        if len(parts) != 3:
-            raise ValueError(f"Invalid time format: {time_str}")
-        
-        try:
-            hours = float(parts[0])
-            minutes = float(parts[1])
-            seconds = float(parts[2])
-            
-            return (hours * Config.SECONDS_PER_HOUR + 
-                    minutes * Config.SECONDS_PER_MINUTE + 
-                    seconds)
-        except ValueError as e:
-            raise ValueError(f"Invalid time components in {time_str}: {e}")
\ No newline at end of file
+    def _parse_srt_time(time_str: str) -> int:
+        """Convert a standalone SRT timestamp to milliseconds"""
+        return _parse_timestamp(time_str)
\ No newline at end of file